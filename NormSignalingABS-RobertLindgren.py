@@ -26,9 +26,29 @@
 ## A Python-Based Introduction" (Isaac 2008).
 
 from __future__ import division
-import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import itertools
+import os
 import pickle
 
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError: ## Without Numba the simulation runs the same functions uncompiled
+    def njit(*args, **kwargs):
+        """Stands in for numba.njit, returning the decorated function unchanged."""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda function: function
+
+try:
+    import h5py
+except ImportError: ## Without h5py every game is saved to its own pickle file
+    h5py = None
+
 __author__ = 'Robert Lindgren'
 
 ## DECLARE GLOBAL VARIABLES
@@ -37,359 +57,350 @@ POPSIZE = 1000 ## Number of players in population
 NUMROUNDS = 1000 ## Number of rounds per game
 MAXMULT = 1 ## Maximum multiplier of PropTypeA1
 MAXWEIGHT = 1 ## Largest multiplier of Game B payoffs
+INTERACTIONS_PER_ROUND = POPSIZE//20 - 1 ## Number of games played per round
+SEED = 12345 ## Default base seed of every game's random number generator
 PROPTYPE1 = 0.5 #Proportion of Type 1 players in population
 PROPTYPE2 = 1 - PROPTYPE1 #Proportion of Type 2 players in population
+PROPTYPES = np.array([PROPTYPE1, PROPTYPE2]) ## Proportions of Type 1 and Type 2 players, indexed by [playertype-1]
 
+## Aggregate variables recorded each round, in the order they are saved
+AGGVARS = ('PropPlayingA1', 'PropPlayingA2', 'PropPlayingB1', 'PropPlayingB2', 'ProbType1GivenA1', 
+           'ProbType2GivenA1', 'ProbType1GivenA2', 'ProbType2GivenA2', 'Type1PlayingA1', 'Type1PlayingA2', 
+           'Type2PlayingA1', 'Type2PlayingA2', 'Type1PlayingB1', 'Type1PlayingB2', 'Type2PlayingB1', 
+           'Type2PlayingB2', 'proptype1otherA1playB1', 'proptype1otherA1playB2', 'proptype1otherA2playB1', 
+           'proptype1otherA2playB2', 'proptype2otherA1playB1', 'proptype2otherA1playB2', 'proptype2otherA2playB1', 
+           'proptype2otherA2playB2')
+RESULTS_DTYPE = np.dtype([(name, np.float64) for name in AGGVARS]) ## One row of aggregate variables per round
 
-## BEGIN CLASS DEFINITIONS
+## Initial proportions of each type playing B1 and B2 given their last Game B opponent's Game A action, 
+## the same in every game
+INITIAL_OTHER_AGGS = {'proptype1otherA1playB1': 0.5, 'proptype1otherA1playB2': 0.5, 'proptype1otherA2playB1': 0.5, 
+                      'proptype1otherA2playB2': 0.5, 'proptype2otherA1playB1': 0.5, 'proptype2otherA1playB2': 0.5, 
+                      'proptype2otherA2playB1': 0.5, 'proptype2otherA2playB2': 0.5}
 
-class SimplePlayer:  
-    """Defines our basic player."""
-    
-    def __init__(self, z, playerlistType1, playerlistType2, weight, roundAgg):
-        """Initializes players.
-        
-        Argument(s): 
-            z -- integer, player index.
-            playerlistType1 -- list, of Type1 player indices.
-            playerlistType2 -- list, of Type2 player indices.
-            weight -- integer, multiplies Game B payoffs.
-            roundAgg -- dict, key-value pairs that represent the state of the population in current round.  
-            
-        Return(s): 
-            none.
-        """
-        
-        global PROPTYPE1
-        
-        self.playerindex = z
-        self.playertype = self.getplayertype() ## Assigns a playertype of 1 or 2
-        self.actionA = self.getactionA(roundAgg) ## Assigns an intial Game A action of 1 or 2
-        self.actionB = self.getactionB(roundAgg) ## Assigns an intial Game B action of 1 or 2
-        self.numGameA = 0 ## This counts how many A Games the player has played
-        self.numGameB = 0 ## This counts how many B Games the player has played
-        self.lastActionA = self.actionA
-        self.lastActionB = self.actionB
-        self.lastGameAPay = random.uniform(0, 3)
-        self.lastGameBPay = random.uniform(0, (3*weight))
-        self.lastOppGameA = random.uniform(0, 3)
-        self.lastOppGameB = random.uniform(0, (3*weight))
-        self.lastOppGameBLastActionA = random.randint(1,2)
-        if self.playertype == 1:
-            playerlistType1.append(self.playerindex)
-        else:
-            playerlistType2.append(self.playerindex)
+## Game A and B payoff matrices, indexed by [own action-1, opponent action-1]. Game B is stacked by player 
+## type (B1 for Game B for a type 1 player, B2 is Game B for a type 2 player) and multiplied by each game's weight.
+GAMEA_PAY = np.array([[3, 0], [0, 3]], dtype=np.float64)
+GAMEB_PAY = np.array([[[3, 0], [0, 3]], [[0, 3], [3, 0]]], dtype=np.float64)
 
-    def getplayertype(self):
-        """
-        Randomly chooses a player type with probability Type1.
-        
-        Argument(s): 
-            none.  
-            
-        Return(s): 
-            integer, 1 if player is Type 1 or 2 if player is Type 2.
-        """
-        
-        global PROPTYPE1
-        
-        if random.uniform(0,1) < PROPTYPE1:  ## If a randomly drawn number between 0 and 1 is less than PROPTYPE1, playertype returns 1 to indicate the player is Type 1
-            return (1)
-        else:
-            return (2)  ## If the random number is greater than PROPTYPE1, playertype returns 2 to indicate player is of type 2
-    
-    def getactionA(self, roundAgg):
-        """
-        Randomly chooses an initial Game A action based on the input parameters.
-            
-        Argument(s): 
-            roundAgg -- dict, key-value pairs that represent the state of the population in current round.
-            
-        Return(s): 
-            integer, 1 for action A1 or 2 for action A2.
-        """
-                
-        Type1PlayingA1=roundAgg['Type1PlayingA1']
-        Type2PlayingA1=roundAgg['Type2PlayingA1']
-        
-        if self.playertype == 1:
-            if random.uniform(0,1) < Type1PlayingA1:  ## If a randomly drawn number between 0 and 1 is less than Type1PlayingA1, actionA returns 1
-                return (1)
-            else:
-                return (2)  ## If the random number is greater than PROPTYPE1, playertype returns 2 to indicate player is of type 2
-        if self.playertype == 2:
-            if random.uniform(0,1) < Type2PlayingA1:  ## If a randomly drawn number between 0 and 1 is less than Type2PlayingA1, actionA returns 1
-                return (1)
-            else:
-                return (2)  ## If the random number is greater than PROPTYPE1, playertype returns 2 to indicate player is of type 2
-    
-    def getactionB(self, roundAgg):
-        """
-        Randomly chooses an initial Game B action given the input parameters.
-        
-        Argument(s): 
-            roundAgg -- dict, key-value pairs that represent the state of the population in current round.
-            
-        Return(s): 
-            integer, 1 for action B1 or 2 for action B2.
-        """
-                
-        Type1PlayingB1=roundAgg['Type1PlayingB1'] 
-        Type2PlayingB1=roundAgg['Type2PlayingB1']
-        
-        if self.playertype == 1:
-            if random.uniform(0,1) < Type1PlayingB1:  ## If a randomly drawn number between 0 and 1 is less than Type1PlayingB1, actionB returns 1
-                return (1)
-            return (2)  ## If the random number is greater than PROPTYPE1, playertype returns 2 to indicate player is of type 2
-        if self.playertype == 2:
-            if random.uniform(0,1) < Type2PlayingB1:  ## If a randomly drawn number between 0 and 1 is less than Type2PlayingB1, actionB returns 1
-                return (1)
-            return (2)  ## If the random number is greater than PROPTYPE1, playertype returns 2 to indicate player is of type 2
 
-    
-    def moveA(self, opp_index, GameA_PAYOFFMAT, GameB1_PAYOFFMAT, GameB2_PAYOFFMAT, playerlistType1, 
-              playerlistType2, playerdict, roundAgg):
-        """
-        Determines an action in Game A.
-        
-        Argument(s): 
-            opp_index -- integer, opponent's player index.
-            GameA_PAYOFFMAT -- dict, payoff matrix for Game A, all players.
-            GameB1_PAYOFFMAT -- dict, payoff matrix for Game B, Type 1.
-            GameB2_PAYOFFMAT -- dict, payoff matrix for Game B, Type 2.
-            playerlistType1 -- list, of Type 1 player indices.
-            playerlistType2 -- list, of Type 2 player indices.
-            playerdict -- dict, of players
-            roundAgg -- dict, key-value pairs that represent the state of the population in current round.
-            
-        Return(s): 
-            integer, 1 for action B1 or 2 for action B2.
-        """
-                        
-        PropPlayingA1=roundAgg['PropPlayingA1']
-        PropPlayingA2=roundAgg['PropPlayingA2']
-        proptype1otherA1playB1=roundAgg['proptype1otherA1playB1']
-        proptype1otherA1playB2=roundAgg['proptype1otherA1playB2']
-        proptype1otherA2playB1=roundAgg['proptype1otherA2playB1']
-        proptype1otherA2playB2=roundAgg['proptype1otherA2playB2']
-        proptype2otherA1playB1=roundAgg['proptype2otherA1playB1']
-        proptype2otherA1playB2=roundAgg['proptype2otherA1playB2']
-        proptype2otherA2playB1=roundAgg['proptype2otherA2playB1']
-        proptype2otherA2playB2=roundAgg['proptype2otherA2playB2']
-        
-        if self.numGameA == 0:
-            self.numGameA = self.numGameA + 1
-            if self.playertype == 1:
-                local_payoffmat = GameB1_PAYOFFMAT
-            else:
-                local_payoffmat = GameB2_PAYOFFMAT
-            if (self.lastActionB == 1):
-                indirectPayA1 = PROPTYPE1*(proptype1otherA1playB1*local_payoffmat['B1B1']+proptype1otherA1playB2*local_payoffmat['B1B2'])+PROPTYPE2*(proptype2otherA1playB1*local_payoffmat['B1B1']+proptype2otherA1playB2*local_payoffmat['B1B2'])
-                indirectPayA2 = PROPTYPE1*(proptype1otherA2playB1*local_payoffmat['B1B1']+proptype1otherA2playB2*local_payoffmat['B1B2'])+PROPTYPE2*(proptype2otherA2playB1*local_payoffmat['B1B1']+proptype2otherA2playB2*local_payoffmat['B1B2'])
-            elif (self.lastActionB == 2):
-                indirectPayA1 = PROPTYPE1*(proptype1otherA1playB1*local_payoffmat['B2B1']+proptype1otherA1playB2*local_payoffmat['B2B2'])+PROPTYPE2*(proptype2otherA1playB1*local_payoffmat['B2B1']+proptype2otherA1playB2*local_payoffmat['B2B2'])
-                indirectPayA2 = PROPTYPE1*(proptype1otherA2playB1*local_payoffmat['B2B1']+proptype1otherA2playB2*local_payoffmat['B2B2'])+PROPTYPE2*(proptype2otherA2playB1*local_payoffmat['B2B1']+proptype2otherA2playB2*local_payoffmat['B2B2'])
-            evfora1 = PropPlayingA1*GameA_PAYOFFMAT.get('A1A1') + PropPlayingA2*GameA_PAYOFFMAT.get('A1A2') + indirectPayA1
-            evfora2 = PropPlayingA1*GameA_PAYOFFMAT.get('A2A1') + PropPlayingA2*GameA_PAYOFFMAT.get('A2A2') + indirectPayA2
-            EVdictA = {1: evfora1, 2: evfora2}
-            actionA = max(EVdictA, key=EVdictA.get)
-            self.lastActionA = actionA
-            self.lastGameAPay = EVdictA.get(actionA)
-            self.lastOppGameA = opp_index
-            return(actionA)
-        else:
-            self.numGameA = self.numGameA + 1    
-            
-            ## Gets revision probability   
-            MyAction = self.lastActionA
-            if self.playertype == 1:
-                ObservedPlayerIndex = random.choice(playerlistType1)
-            elif self.playertype == 2:
-                ObservedPlayerIndex = random.choice(playerlistType2)
-            if playerdict[ObservedPlayerIndex].lastActionA == MyAction:
-                return (MyAction)
-            revisionProb = max(0, ((playerdict[ObservedPlayerIndex].lastGameAPay - self.lastGameAPay)/3))
-            
-            ## Uses revision probability to decide whether or not to change strategies
-            if random.uniform(0,1) > revisionProb:  ## If a randomly drawn number between 0 and 1 is less than Type1PlayingA1, actionA returns 1
-                return (self.lastActionA)
-            else:  
-                if self.playertype == 1:
-                    local_payoffmat = GameB1_PAYOFFMAT
-                else:
-                    local_payoffmat = GameB2_PAYOFFMAT
-                if (self.lastActionB == 1):
-                    indirectPayA1 = PROPTYPE1*(proptype1otherA1playB1*local_payoffmat.get('B1B1')+proptype1otherA1playB2*local_payoffmat.get('B1B2'))+PROPTYPE2*(proptype2otherA1playB1*local_payoffmat.get('B1B1')+proptype2otherA1playB2*local_payoffmat.get('B1B2'))
-                    indirectPayA2 = PROPTYPE1*(proptype1otherA2playB1*local_payoffmat.get('B1B1')+proptype1otherA2playB2*local_payoffmat.get('B1B2'))+PROPTYPE2*(proptype2otherA2playB1*local_payoffmat.get('B1B1')+proptype2otherA2playB2*local_payoffmat.get('B1B2'))
-                elif (self.lastActionB == 2):
-                    indirectPayA1 = PROPTYPE1*(proptype1otherA1playB1*local_payoffmat.get('B2B1')+proptype1otherA1playB2*local_payoffmat.get('B2B2'))+PROPTYPE2*(proptype2otherA1playB1*local_payoffmat.get('B2B1')+proptype2otherA1playB2*local_payoffmat.get('B2B2'))
-                    indirectPayA2 = PROPTYPE1*(proptype1otherA2playB1*local_payoffmat.get('B2B1')+proptype1otherA2playB2*local_payoffmat.get('B2B2'))+PROPTYPE2*(proptype2otherA2playB1*local_payoffmat.get('B2B1')+proptype2otherA2playB2*local_payoffmat.get('B2B2'))
-                evfora1 = PropPlayingA1*GameA_PAYOFFMAT.get('A1A1') + PropPlayingA2*GameA_PAYOFFMAT.get('A1A2') + indirectPayA1
-                evfora2 = PropPlayingA1*GameA_PAYOFFMAT.get('A2A1') + PropPlayingA2*GameA_PAYOFFMAT.get('A2A2') + indirectPayA2
-                EVdictA = {1: evfora1, 2: evfora2}
-                actionA = max(EVdictA, key=EVdictA.get)
-                self.lastActionA = actionA
-                self.lastGameAPay = EVdictA.get(actionA)
-                self.lastOppGameA = opp_index
-                return(actionA)
-                
-    
-    def moveB(self, opp_index, GameA_PAYOFFMAT, GameB1_PAYOFFMAT, GameB2_PAYOFFMAT, playerlistType1, 
-              playerlistType2, playerdict, roundAgg):
-        """
-        Determines an action in GameB.
-        
-        Argument(s): 
-            opp_index -- integer, opponent's player index.
-            GameA_PAYOFFMAT -- dict, payoff matrix for Game A, all players.
-            GameB1_PAYOFFMAT -- dict, payoff matrix for Game B, Type 1.
-            GameB2_PAYOFFMAT -- dict, payoff matrix for Game B, Type 2.
-            playerlistType1 -- list, of Type 1 player indices.
-            playerlistType2 -- list, of Type 2 player indices.
-            playerdict -- dict, of players
-            roundAgg -- dict, key-value pairs that represent the state of the population in current round.
-            
-        Return(s): 
-            integer, 1 for action B1 or 2 for action B2.
-        """
-        
-        ProbType1GivenA1=roundAgg['ProbType1GivenA1']
-        ProbType2GivenA1=roundAgg['ProbType2GivenA1']
-        ProbType1GivenA2=roundAgg['ProbType1GivenA2']
-        ProbType2GivenA2=roundAgg['ProbType2GivenA2']
-        Type1PlayingB1=roundAgg['Type1PlayingB1']
-        Type1PlayingB2=roundAgg['Type1PlayingB2']
-        Type2PlayingB1=roundAgg['Type2PlayingB1']
-        Type2PlayingB2=roundAgg['Type2PlayingB2']    
-        
-        if self.numGameB == 0:
-            self.numGameB = self.numGameB + 1
-            if self.playertype == 1:
-                local_payoffmat = GameB1_PAYOFFMAT
-            elif self.playertype == 2:
-                local_payoffmat = GameB2_PAYOFFMAT
-            if playerdict[opp_index].lastActionA == 1:
-                evforb1 = ProbType1GivenA1*((Type1PlayingB1*local_payoffmat['B1B1'])+(Type1PlayingB2*local_payoffmat['B1B2']))+ProbType2GivenA1*((Type2PlayingB1*local_payoffmat['B1B1'])+(Type2PlayingB2*local_payoffmat['B1B2'])) # payoff function for a player playing action B1
-                evforb2 = ProbType1GivenA1*((Type1PlayingB1*local_payoffmat['B2B1'])+(Type1PlayingB2*local_payoffmat['B2B2']))+ProbType2GivenA1*((Type2PlayingB1*local_payoffmat['B2B1'])+(Type2PlayingB2*local_payoffmat['B2B2'])) # payoff function for a player playing action B2
-            elif playerdict[opp_index].lastActionA == 2:
-                evforb1 = ProbType1GivenA2*((Type1PlayingB1*local_payoffmat['B1B1'])+(Type1PlayingB2*local_payoffmat['B1B2']))+ProbType2GivenA2*((Type2PlayingB1*local_payoffmat['B1B1'])+(Type2PlayingB2*local_payoffmat['B1B2'])) # payoff function for a player playing action B1
-                evforb2 = ProbType1GivenA2*((Type1PlayingB1*local_payoffmat['B2B1'])+(Type1PlayingB2*local_payoffmat['B2B2']))+ProbType2GivenA2*((Type2PlayingB1*local_payoffmat['B2B1'])+(Type2PlayingB2*local_payoffmat['B2B2'])) # payoff function for a player playing action B2
-            EVdictB = {1: evforb1, 2: evforb2}
-            actionB = max(EVdictB, key=EVdictB.get)
-            self.lastActionB = actionB
-            self.lastGameBPay = EVdictB.get(actionB)
-            self.lastOppGameB = opp_index
-            return(actionB)
-        else:
-            self.numGameB = self.numGameB + 1            
-            MyAction = self.lastActionB
-            if self.playertype == 1:
-                ObservedPlayerIndex = random.choice(playerlistType1)
-            elif self.playertype == 2:
-                ObservedPlayerIndex = random.choice(playerlistType2)
-            if playerdict[ObservedPlayerIndex].lastActionB == MyAction:
-                return(MyAction)
-            revisionProb = max(0, ((playerdict[ObservedPlayerIndex].lastGameBPay - self.lastGameBPay)/3))
-            if random.uniform(0,1) > revisionProb:
-                return (self.lastActionB)
-            else:       
-                if self.playertype == 1:
-                    local_payoffmat = GameB1_PAYOFFMAT
-                elif self.playertype == 2:
-                    local_payoffmat = GameB2_PAYOFFMAT    
-                if playerdict[opp_index].lastActionA == 1:
-                    evforb1 = ProbType1GivenA1*((Type1PlayingB1*local_payoffmat['B1B1'])+(Type1PlayingB2*local_payoffmat['B1B2']))+ProbType2GivenA1*((Type2PlayingB1*local_payoffmat['B1B1'])+(Type2PlayingB2*local_payoffmat['B1B2'])) # payoff function for a player playing action B1
-                    evforb2 = ProbType1GivenA1*((Type1PlayingB1*local_payoffmat['B2B1'])+(Type1PlayingB2*local_payoffmat['B2B2']))+ProbType2GivenA1*((Type2PlayingB1*local_payoffmat['B2B1'])+(Type2PlayingB2*local_payoffmat['B2B2'])) # payoff function for a player playing action B2
-                elif playerdict[opp_index].lastActionA == 2:
-                    evforb1 = ProbType1GivenA2*((Type1PlayingB1*local_payoffmat['B1B1'])+(Type1PlayingB2*local_payoffmat['B1B2']))+ProbType2GivenA2*((Type2PlayingB1*local_payoffmat['B1B1'])+(Type2PlayingB2*local_payoffmat['B1B2'])) # payoff function for a player playing action B1
-                    evforb2 = ProbType1GivenA2*((Type1PlayingB1*local_payoffmat['B2B1'])+(Type1PlayingB2*local_payoffmat['B2B2']))+ProbType2GivenA2*((Type2PlayingB1*local_payoffmat['B2B1'])+(Type2PlayingB2*local_payoffmat['B2B2'])) # payoff function for a player playing action B2  
-                EVdictB = {1: evforb1, 2: evforb2}
-                actionB = max(EVdictB, key=EVdictB.get)
-                self.lastActionB = actionB
-                self.lastGameBPay = EVdictB.get(actionB)
-                self.lastOppGameB = opp_index
-                return(actionB)
+## BEGIN CLASS DEFINITIONS
+
+## Defines our basic player population as a struct of arrays. Each field holds one
+## array with an entry per player, indexed by player index 0 through POPSIZE-1.
+Players = namedtuple('Players', ['playertype', ## 1 if player is Type 1 or 2 if player is Type 2
+                                 'numGameA', ## Counts how many A Games the player has played
+                                 'numGameB', ## Counts how many B Games the player has played
+                                 'lastActionA',
+                                 'lastActionB',
+                                 'lastGameAPay',
+                                 'lastGameBPay',
+                                 'lastOppGameA',
+                                 'lastOppGameB',
+                                 'lastOppGameBLastActionA'])
 
 
 ## BEGIN FUNCTION DEFINITIONS
  
-def GeneratePlayers(playerdict, playerlistType1, playerlistType2, weight, roundAgg):
+def GeneratePlayers(weight, roundAgg, rng):
     """
-    Fills playerdict{} with a population of players.
+    Generates a population of players.
     
     Argument(s):
-        playerdict -- dict, of players.
-        playerlistType1 -- list, of Type 1 player indices.
-        playerlistType2 -- list, of Type 2 player indices.
         weight -- integer, multiplies Game B payoffs.
         roundAgg -- dict, key-value pairs that represent the state of the population in current round.
+        rng -- Generator, draws the players' types and initial states.
             
     Return(s): 
-        none.    
+        tuple, of Players and array of player indices by type, indexed by [playertype-1].
     """  
     
-    for z in range(1,POPSIZE+1):
-        playerdict[z] = SimplePlayer(z, playerlistType1, playerlistType2, weight, roundAgg)
+    ## Assigns a playertype of 1 with probability PROPTYPE1, else 2
+    playertype = np.where(rng.random(POPSIZE) < PROPTYPE1, 1, 2).astype(np.int8)
+    
+    ## Assigns initial Game A and Game B actions of 1 with the probability given for the player's type, else 2
+    probA1 = np.where(playertype == 1, roundAgg['Type1PlayingA1'], roundAgg['Type2PlayingA1'])
+    probB1 = np.where(playertype == 1, roundAgg['Type1PlayingB1'], roundAgg['Type2PlayingB1'])
+    actionA = np.where(rng.random(POPSIZE) < probA1, 1, 2).astype(np.int8)
+    actionB = np.where(rng.random(POPSIZE) < probB1, 1, 2).astype(np.int8)
+    
+    ## Last payoffs start from a uniform prior over each game's payoffs, which a player's first revision 
+    ## compares against as if the player had already played
+    players = Players(playertype=playertype,
+                      numGameA=np.zeros(POPSIZE, dtype=np.int32),
+                      numGameB=np.zeros(POPSIZE, dtype=np.int32),
+                      lastActionA=actionA, ## Starts at the initial Game A action of 1 or 2
+                      lastActionB=actionB, ## Starts at the initial Game B action of 1 or 2
+                      lastGameAPay=rng.uniform(0, 3, POPSIZE).astype(np.float32),
+                      lastGameBPay=rng.uniform(0, (3*weight), POPSIZE).astype(np.float32),
+                      lastOppGameA=np.full(POPSIZE, -1, dtype=np.int32), ## -1 until the player has an opponent
+                      lastOppGameB=np.full(POPSIZE, -1, dtype=np.int32),
+                      lastOppGameBLastActionA=rng.integers(1, 3, POPSIZE, dtype=np.int8))
+    
+    ## Type 1 and Type 2 player indices as the rows of one array, padded with -1 to the same length
+    playerlistType1 = np.where(playertype == 1)[0]
+    playerlistType2 = np.where(playertype == 2)[0]
+    playerlists = np.full((2, max(len(playerlistType1), len(playerlistType2))), -1, dtype=np.intp)
+    playerlists[0, :len(playerlistType1)] = playerlistType1
+    playerlists[1, :len(playerlistType2)] = playerlistType2
+    
+    return players, playerlists
 
-def playGameA(p1index, p2index, GameA_PAYOFFMAT, GameB1_PAYOFFMAT, GameB2_PAYOFFMAT, playerlistType1, playerlistType2, 
-              playerdict, roundAgg):
+def expectedPayoffs(GameA_PAY, GameB_PAY, roundAgg):
+    """
+    Computes the expected payoff of each action for every kind of player in the current round.
+    
+    Argument(s): 
+        GameA_PAY -- array, 2x2 payoff matrix for Game A, all players.
+        GameB_PAY -- array, 2x2x2 payoff matrices for Game B, indexed by [playertype-1].
+        roundAgg -- dict, key-value pairs that represent the state of the population in current round.
+        
+    Return(s): 
+        tuple, of arrays EVA indexed by [playertype-1, lastActionB-1, actionA-1] and 
+        EVB indexed by [playertype-1, opponent's lastActionA-1, actionB-1].
+    """
+    
+    ## Proportion of each type playing B1 and B2, given their last Game B opponent played A1 or A2 
+    otherType1 = np.array([[roundAgg['proptype1otherA1playB1'], roundAgg['proptype1otherA1playB2']], 
+                           [roundAgg['proptype1otherA2playB1'], roundAgg['proptype1otherA2playB2']]])
+    otherType2 = np.array([[roundAgg['proptype2otherA1playB1'], roundAgg['proptype2otherA1playB2']], 
+                           [roundAgg['proptype2otherA2playB1'], roundAgg['proptype2otherA2playB2']]])
+    B1 = GameB_PAY[:, :, 0, None] ## Game B payoff against B1, indexed by [playertype-1, own action-1]
+    B2 = GameB_PAY[:, :, 1, None] ## Game B payoff against B2, indexed by [playertype-1, own action-1]
+    
+    ## Game A payoff plus the indirect Game B payoff expected from signaling with action A1 or A2
+    indirectPay = (PROPTYPE1*(otherType1[:, 0]*B1+otherType1[:, 1]*B2)
+                   +PROPTYPE2*(otherType2[:, 0]*B1+otherType2[:, 1]*B2))
+    EVA = roundAgg['PropPlayingA1']*GameA_PAY[:, 0] + roundAgg['PropPlayingA2']*GameA_PAY[:, 1] + indirectPay
+    
+    ## Game B payoff given the opponent's last Game A action
+    ProbType1GivenA = np.array([roundAgg['ProbType1GivenA1'], roundAgg['ProbType1GivenA2']])[None, :, None]
+    ProbType2GivenA = np.array([roundAgg['ProbType2GivenA1'], roundAgg['ProbType2GivenA2']])[None, :, None]
+    payType1 = (roundAgg['Type1PlayingB1']*GameB_PAY[:, :, 0])+(roundAgg['Type1PlayingB2']*GameB_PAY[:, :, 1])
+    payType2 = (roundAgg['Type2PlayingB1']*GameB_PAY[:, :, 0])+(roundAgg['Type2PlayingB2']*GameB_PAY[:, :, 1])
+    EVB = ProbType1GivenA*payType1[:, None, :]+ProbType2GivenA*payType2[:, None, :]
+    
+    return EVA, EVB
+
+@njit(cache=True)
+def moveA(i, opp_index, EVA, observedPlayers, revisionDraw, 
+          playertype, numGameA, lastActionA, lastActionB, lastGameAPay, lastOppGameA):
+    """
+    Determines an action in Game A.
+    
+    Argument(s): 
+        i -- integer, player index.
+        opp_index -- integer, opponent's player index.
+        EVA -- array, expected Game A payoffs for the current round, see expectedPayoffs.
+        observedPlayers -- array, indices of the Type 1 and Type 2 player the player observes if of that type.
+        revisionDraw -- floating point, uniform draw between 0 and 1 for the revision decision.
+        playertype, numGameA, lastActionA, lastActionB, lastGameAPay, lastOppGameA -- 
+            arrays, the matching fields of Players, updated in place.
+        
+    Return(s): 
+        integer, 1 for action A1 or 2 for action A2.
+    """
+    
+    t = playertype[i]-1 ## Row of the player's type in observedPlayers and EVA
+    
+    ## A player's first Game A skips revision and goes straight to a best response
+    first = numGameA[i] == 0
+    numGameA[i] += 1
+    if not first:
+        ## Gets revision probability   
+        MyAction = lastActionA[i]
+        ObservedPlayerIndex = observedPlayers[t]
+        if lastActionA[ObservedPlayerIndex] == MyAction:
+            return (MyAction)
+        revisionProb = max(0, ((lastGameAPay[ObservedPlayerIndex] - lastGameAPay[i])/3))
+        
+        ## Uses revision probability to decide whether or not to change strategies
+        if revisionDraw > revisionProb:
+            return (lastActionA[i])
+    
+    evfora1 = EVA[t, lastActionB[i]-1, 0]
+    evfora2 = EVA[t, lastActionB[i]-1, 1]
+    actionA = 1 + int(evfora2 > evfora1) ## Ties go to action A1
+    lastActionA[i] = actionA
+    lastGameAPay[i] = evfora1 if actionA == 1 else evfora2
+    lastOppGameA[i] = opp_index
+    return(actionA)
+
+@njit(cache=True)
+def moveB(i, opp_index, EVB, observedPlayers, revisionDraw, 
+          playertype, numGameB, lastActionA, lastActionB, lastGameBPay, lastOppGameB):
+    """
+    Determines an action in GameB.
+    
+    Argument(s): 
+        i -- integer, player index.
+        opp_index -- integer, opponent's player index.
+        EVB -- array, expected Game B payoffs for the current round, see expectedPayoffs.
+        observedPlayers -- array, indices of the Type 1 and Type 2 player the player observes if of that type.
+        revisionDraw -- floating point, uniform draw between 0 and 1 for the revision decision.
+        playertype, numGameB, lastActionA, lastActionB, lastGameBPay, lastOppGameB -- 
+            arrays, the matching fields of Players, updated in place.
+        
+    Return(s): 
+        integer, 1 for action B1 or 2 for action B2.
+    """
+    
+    t = playertype[i]-1 ## Row of the player's type in observedPlayers and EVB
+    
+    first = numGameB[i] == 0
+    numGameB[i] += 1
+    if not first:
+        MyAction = lastActionB[i]
+        ObservedPlayerIndex = observedPlayers[t]
+        if lastActionB[ObservedPlayerIndex] == MyAction:
+            return(MyAction)
+        revisionProb = max(0, ((lastGameBPay[ObservedPlayerIndex] - lastGameBPay[i])/3))
+        if revisionDraw > revisionProb:
+            return (lastActionB[i])
+    
+    evforb1 = EVB[t, lastActionA[opp_index]-1, 0]
+    evforb2 = EVB[t, lastActionA[opp_index]-1, 1]
+    actionB = 1 + int(evforb2 > evforb1) ## Ties go to action B1
+    lastActionB[i] = actionB
+    lastGameBPay[i] = evforb1 if actionB == 1 else evforb2
+    lastOppGameB[i] = opp_index
+    return(actionB)
+
+@njit(cache=True)
+def playGameA(p1index, p2index, EVA, observedPlayers, revisionDraws, 
+              playertype, numGameA, lastActionA, lastActionB, lastGameAPay, lastOppGameA):
     """
     Gets player moves for GameA and stores game history.
     
     Argument(s): 
         p1index -- integer, index of player 1.
         p2index -- integer, index of player 2.
-        GameA_PAYOFFMAT -- dict, payoff matrix for Game A, all players.
-        GameB1_PAYOFFMAT -- dict, payoff matrix for Game B, Type 1.
-        GameB2_PAYOFFMAT -- dict, payoff matrix for Game B, Type 2.
-        playerlistType1 -- list, of Type 1 player indices.
-        playerlistType2 -- list, of Type 2 player indices.
-        playerdict -- dict, of players
-        roundAgg -- dict, key-value pairs that represent the state of the population in current round.
+        EVA -- array, expected Game A payoffs for the current round, see expectedPayoffs.
+        observedPlayers -- array, observedPlayers of player 1 and player 2, see moveA.
+        revisionDraws -- array, revisionDraw of player 1 and player 2, see moveA.
+        playertype, numGameA, lastActionA, lastActionB, lastGameAPay, lastOppGameA -- 
+            arrays, the matching fields of Players, updated in place.
         
     Return(s): 
         none.
     """     
     
-    player1action = playerdict[p1index].moveA(p2index, GameA_PAYOFFMAT, GameB1_PAYOFFMAT, GameB2_PAYOFFMAT, 
-                              playerlistType1, playerlistType2, playerdict, roundAgg)
-    player2action = playerdict[p2index].moveA(p1index, GameA_PAYOFFMAT, GameB1_PAYOFFMAT, GameB2_PAYOFFMAT, 
-                              playerlistType1, playerlistType2, playerdict, roundAgg)
-    playerdict[p1index].lastActionA = player1action
-    playerdict[p2index].lastActionA = player2action
-    playerdict[p1index].lastOppGameA = p2index
-    playerdict[p2index].lastOppGameA = p1index
+    player1action = moveA(p1index, p2index, EVA, observedPlayers[0], revisionDraws[0], 
+                          playertype, numGameA, lastActionA, lastActionB, lastGameAPay, lastOppGameA)
+    player2action = moveA(p2index, p1index, EVA, observedPlayers[1], revisionDraws[1], 
+                          playertype, numGameA, lastActionA, lastActionB, lastGameAPay, lastOppGameA)
+    lastActionA[p1index] = player1action
+    lastActionA[p2index] = player2action
+    lastOppGameA[p1index] = p2index
+    lastOppGameA[p2index] = p1index
 
-def playGameB(p1index, p2index, GameA_PAYOFFMAT, GameB1_PAYOFFMAT, GameB2_PAYOFFMAT, playerlistType1, playerlistType2, 
-              playerdict, roundAgg):
+@njit(cache=True)
+def playGameB(p1index, p2index, EVB, observedPlayers, revisionDraws, 
+              playertype, numGameB, lastActionA, lastActionB, lastGameBPay, lastOppGameB, 
+              lastOppGameBLastActionA):
     """
     Gets player moves for GameB and stores game history.
     
     Argument(s): 
         p1index -- integer, index of player 1.
         p2index -- integer, index of player 2.
-        GameA_PAYOFFMAT -- dict, payoff matrix for Game A, all players.
-        GameB1_PAYOFFMAT -- dict, payoff matrix for Game B, Type 1.
-        GameB2_PAYOFFMAT -- dict, payoff matrix for Game B, Type 2.
-        playerlistType1 -- list, of Type 1 player indices.
-        playerlistType2 -- list, of Type 2 player indices.
-        playerdict -- dict, of players.
-        roundAgg -- dict, key-value pairs that represent the state of the population in current round.
+        EVB -- array, expected Game B payoffs for the current round, see expectedPayoffs.
+        observedPlayers -- array, observedPlayers of player 1 and player 2, see moveA.
+        revisionDraws -- array, revisionDraw of player 1 and player 2, see moveA.
+        playertype, numGameB, lastActionA, lastActionB, lastGameBPay, lastOppGameB, lastOppGameBLastActionA -- 
+            arrays, the matching fields of Players, updated in place.
         
     Return(s): 
         none.
     """      
     
-    player1action = playerdict[p1index].moveB(p2index, GameA_PAYOFFMAT, GameB1_PAYOFFMAT, GameB2_PAYOFFMAT, playerlistType1, 
-                              playerlistType2, playerdict, roundAgg)
-    player2action = playerdict[p2index].moveB(p1index, GameA_PAYOFFMAT, GameB1_PAYOFFMAT, GameB2_PAYOFFMAT, playerlistType1, 
-                              playerlistType2, playerdict, roundAgg)
-    playerdict[p1index].lastActionB = player1action
-    playerdict[p2index].lastActionB = player2action
-    playerdict[p1index].lastOppGameB = p2index
-    playerdict[p2index].lastOppGameB = p1index
-    playerdict[p1index].lastOppGameBLastActionA = playerdict[p2index].lastActionA
-    playerdict[p2index].lastOppGameBLastActionA = playerdict[p1index].lastActionA
+    player1action = moveB(p1index, p2index, EVB, observedPlayers[0], revisionDraws[0], 
+                          playertype, numGameB, lastActionA, lastActionB, lastGameBPay, lastOppGameB)
+    player2action = moveB(p2index, p1index, EVB, observedPlayers[1], revisionDraws[1], 
+                          playertype, numGameB, lastActionA, lastActionB, lastGameBPay, lastOppGameB)
+    lastActionB[p1index] = player1action
+    lastActionB[p2index] = player2action
+    lastOppGameB[p1index] = p2index
+    lastOppGameB[p2index] = p1index
+    lastOppGameBLastActionA[p1index] = lastActionA[p2index]
+    lastOppGameBLastActionA[p2index] = lastActionA[p1index]
+
+@njit(cache=True)
+def stateKey(i, playertype, lastActionA, lastActionB, lastOppGameBLastActionA):
+    """
+    Packs a player's state into one key.
+    
+    Argument(s): 
+        i -- integer, player index.
+        playertype, lastActionA, lastActionB, lastOppGameBLastActionA -- arrays, the matching fields of Players.
+        
+    Return(s): 
+        integer, between 0 and 15, see stateCounts.
+    """
+    
+    return (playertype[i]-1)*8 + (lastOppGameBLastActionA[i]-1)*4 + (lastActionA[i]-1)*2 + (lastActionB[i]-1)
+
+@njit(cache=True)
+def stateCounts(playertype, lastActionA, lastActionB, lastOppGameBLastActionA):
+    """
+    Counts the players in each state.
+    
+    Argument(s): 
+        playertype, lastActionA, lastActionB, lastOppGameBLastActionA -- arrays, the matching fields of Players.
+        
+    Return(s): 
+        array, of the number of players with each key of stateKey, indexed by [playertype-1]*8 + 
+        [lastOppGameBLastActionA-1]*4 + [lastActionA-1]*2 + [lastActionB-1].
+    """
+    
+    ## Packs each player's state into one key and counts all 16 states in one pass
+    keys = ((playertype-1)*8 + (lastOppGameBLastActionA-1)*4 + (lastActionA-1)*2 + (lastActionB-1)).astype(np.intp)
+    return np.bincount(keys, minlength=16)
+
+@njit(cache=True)
+def playRound(pairs, games, EVA, EVB, observedPlayers, revisionDraws, counts, 
+              playertype, numGameA, numGameB, lastActionA, lastActionB, lastGameAPay, lastGameBPay, 
+              lastOppGameA, lastOppGameB, lastOppGameBLastActionA):
+    """
+    Plays every interaction of one round, in order.
+    
+    Argument(s): 
+        pairs -- array, player 1 and player 2 indices of each interaction.
+        games -- array, 0 for Game A or 1 for Game B for each interaction.
+        EVA -- array, expected Game A payoffs for the current round, see expectedPayoffs.
+        EVB -- array, expected Game B payoffs for the current round, see expectedPayoffs.
+        observedPlayers -- array, observedPlayers of player 1 and player 2 of each interaction, see moveA.
+        revisionDraws -- array, revisionDraw of player 1 and player 2 of each interaction, see moveA.
+        counts -- array, the number of players in each state, see stateCounts, updated in place.
+        playertype, numGameA, numGameB, lastActionA, lastActionB, lastGameAPay, lastGameBPay, lastOppGameA, 
+        lastOppGameB, lastOppGameBLastActionA -- arrays, the fields of Players, updated in place.
+        
+    Return(s): 
+        none.
+    """
+    
+    ## Each game can change the players of later ones, so interactions are played one at a time
+    for y in range(pairs.shape[0]):
+        p1index = pairs[y, 0]
+        p2index = pairs[y, 1]
+        
+        ## A game only changes the states of its players, so they are taken out of the state counts 
+        ## and counted again in their new states (once if a player plays itself)
+        counts[stateKey(p1index, playertype, lastActionA, lastActionB, lastOppGameBLastActionA)] -= 1
+        if p2index != p1index:
+            counts[stateKey(p2index, playertype, lastActionA, lastActionB, lastOppGameBLastActionA)] -= 1
+        
+        if games[y] == 0:
+            playGameA(p1index, p2index, EVA, observedPlayers[y], revisionDraws[y], 
+                      playertype, numGameA, lastActionA, lastActionB, lastGameAPay, lastOppGameA)
+        else:
+            playGameB(p1index, p2index, EVB, observedPlayers[y], revisionDraws[y], 
+                      playertype, numGameB, lastActionA, lastActionB, lastGameBPay, lastOppGameB, 
+                      lastOppGameBLastActionA)
+        
+        counts[stateKey(p1index, playertype, lastActionA, lastActionB, lastOppGameBLastActionA)] += 1
+        if p2index != p1index:
+            counts[stateKey(p2index, playertype, lastActionA, lastActionB, lastOppGameBLastActionA)] += 1
  
 def divide(num, den):
     """
@@ -408,87 +419,69 @@ def divide(num, den):
     else:
         return (num/den)
  
-def countAggs(playerdict, numType1, numType2):
+@njit(cache=True)
+def countStates(counts):
+    """
+    Sums the players in each state into the counts of countAggs.
+    
+    Argument(s): 
+        counts -- array, the number of players in each state, see stateCounts.
+        
+    Return(s): 
+        tuple, of integer counts in the order they are unpacked in countAggs.
+    """
+    
+    ## Indexed by [playertype-1, lastOppGameBLastActionA-1, lastActionA-1, lastActionB-1]
+    counts = counts.reshape((2, 2, 2, 2))
+    
+    ## Gets aggregate counts from this round
+    numtype1otherA1 = counts[0, 0].sum()
+    numtype1otherA2 = counts[0, 1].sum()
+    numtype2otherA1 = counts[1, 0].sum()
+    numtype2otherA2 = counts[1, 1].sum()
+    numtype1otherA1playB1 = counts[0, 0, :, 0].sum()
+    numtype1otherA1playB2 = counts[0, 0, :, 1].sum()
+    numtype1otherA2playB1 = counts[0, 1, :, 0].sum()
+    numtype1otherA2playB2 = counts[0, 1, :, 1].sum()
+    numtype2otherA1playB1 = counts[1, 0, :, 0].sum()
+    numtype2otherA1playB2 = counts[1, 0, :, 1].sum()
+    numtype2otherA2playB1 = counts[1, 1, :, 0].sum()
+    numtype2otherA2playB2 = counts[1, 1, :, 1].sum()
+    numType1PlayingA1 = counts[0, :, 0].sum()
+    numType1PlayingA2 = counts[0, :, 1].sum()
+    numType2PlayingA1 = counts[1, :, 0].sum()
+    numType2PlayingA2 = counts[1, :, 1].sum()
+    numType1PlayingB1 = counts[0, :, :, 0].sum()
+    numType1PlayingB2 = counts[0, :, :, 1].sum()
+    numType2PlayingB1 = counts[1, :, :, 0].sum()
+    numType2PlayingB2 = counts[1, :, :, 1].sum()
+    
+    return (numtype1otherA1, numtype1otherA2, numtype2otherA1, numtype2otherA2, numtype1otherA1playB1,
+            numtype1otherA1playB2, numtype1otherA2playB1, numtype1otherA2playB2, numtype2otherA1playB1,
+            numtype2otherA1playB2, numtype2otherA2playB1, numtype2otherA2playB2, numType1PlayingA1,
+            numType1PlayingA2, numType2PlayingA1, numType2PlayingA2, numType1PlayingB1, numType1PlayingB2,
+            numType2PlayingB1, numType2PlayingB2)
+
+def countAggs(counts, numType1, numType2, roundAgg):
     """
     Counts aggregrate variables and stores them in roundAgg.
     
     Argument(s): 
-        playerdict -- dictionary, holds all players.
+        counts -- array, the number of players in each state, see stateCounts.
         numType1 -- integer, number of Type 1 players.
         numType2 -- integer, number of Type 2 players.
+        roundAgg -- dictionary, aggregate variables, overwritten in place with this round's values.
         
     Return(s): 
         none.
     """      
 
-    ## Initialize all counting variables to 0
-    numType1PlayingA1 = 0
-    numType1PlayingA2 = 0
-    numType2PlayingA1 = 0
-    numType2PlayingA2 = 0
-    numType1PlayingB1 = 0
-    numType1PlayingB2 = 0
-    numType2PlayingB1 = 0
-    numType2PlayingB2 = 0
-    numtype1otherA1 = 0
-    numtype1otherA2 = 0
-    numtype2otherA1 = 0
-    numtype2otherA2 = 0
-    numtype1otherA1playB1 = 0
-    numtype1otherA1playB2 = 0
-    numtype1otherA2playB1 = 0
-    numtype1otherA2playB2 = 0
-    numtype2otherA1playB1 = 0
-    numtype2otherA1playB2 = 0
-    numtype2otherA2playB1 = 0
-    numtype2otherA2playB2 = 0
-    
-    ##Create dictionary for one round of aggregate values
-    roundAgg={}
-    
     ## Gets aggregate counts from this round
-    for z in range (1, POPSIZE):
-        
-            if (playerdict[z].playertype == 1 and playerdict[z].lastOppGameBLastActionA == 1):
-                numtype1otherA1 = numtype1otherA1 + 1
-                if (playerdict[z].lastActionB == 1):
-                    numtype1otherA1playB1 = numtype1otherA1playB1 + 1
-                elif (playerdict[z].lastActionB == 2):
-                    numtype1otherA1playB2 = numtype1otherA1playB2 + 1
-            if (playerdict[z].playertype == 1 and playerdict[z].lastOppGameBLastActionA == 2):
-                numtype1otherA2 = numtype1otherA2 + 1
-                if (playerdict[z].lastActionB == 1):
-                    numtype1otherA2playB1 = numtype1otherA2playB1 + 1
-                elif (playerdict[z].lastActionB == 2):
-                    numtype1otherA2playB2 = numtype1otherA2playB2 + 1
-            if (playerdict[z].playertype == 2 and playerdict[z].lastOppGameBLastActionA == 1):
-                numtype2otherA1 = numtype2otherA1 + 1
-                if (playerdict[z].lastActionB == 1):
-                    numtype2otherA1playB1 = numtype2otherA1playB1 + 1
-                elif (playerdict[z].lastActionB == 2):
-                    numtype2otherA1playB2 = numtype2otherA1playB2 + 1
-            if (playerdict[z].playertype == 2 and playerdict[z].lastOppGameBLastActionA == 2):
-                numtype2otherA2 = numtype2otherA2 + 1
-                if (playerdict[z].lastActionB == 1):
-                    numtype2otherA2playB1 = numtype2otherA2playB1 + 1
-                elif (playerdict[z].lastActionB == 2):
-                    numtype2otherA2playB2 = numtype2otherA2playB2 + 1
-            if playerdict[z].playertype == 1 and playerdict[z].lastActionA == 1:
-                numType1PlayingA1 = numType1PlayingA1 + 1
-            if playerdict[z].playertype == 1 and playerdict[z].lastActionA == 2:
-                numType1PlayingA2 = numType1PlayingA2 + 1
-            if (playerdict[z].playertype == 2 and playerdict[z].lastActionA == 1):
-                numType2PlayingA1 = numType2PlayingA1 + 1
-            if (playerdict[z].playertype == 2 and playerdict[z].lastActionA == 2):
-                numType2PlayingA2 = numType2PlayingA2 + 1
-            if (playerdict[z].playertype == 1 and playerdict[z].lastActionB == 1):
-                numType1PlayingB1 = numType1PlayingB1 + 1
-            if (playerdict[z].playertype == 1 and playerdict[z].lastActionB == 2):
-                numType1PlayingB2 = numType1PlayingB2 + 1
-            if (playerdict[z].playertype == 2 and playerdict[z].lastActionB == 1):
-                numType2PlayingB1 = numType2PlayingB1 + 1
-            if (playerdict[z].playertype == 2 and playerdict[z].lastActionB == 2):
-                numType2PlayingB2 = numType2PlayingB2 + 1
+    (numtype1otherA1, numtype1otherA2, numtype2otherA1, numtype2otherA2, numtype1otherA1playB1,
+     numtype1otherA1playB2, numtype1otherA2playB1, numtype1otherA2playB2, numtype2otherA1playB1,
+     numtype2otherA1playB2, numtype2otherA2playB1, numtype2otherA2playB2, numType1PlayingA1,
+     numType1PlayingA2, numType2PlayingA1, numType2PlayingA2, numType1PlayingB1, numType1PlayingB2,
+     numType2PlayingB1, numType2PlayingB2) = countStates(counts)
 
     ## Calculates aggregate proportions from counts
     roundAgg['proptype1otherA1playB1'] = divide(numtype1otherA1playB1, numtype1otherA1)
@@ -507,113 +500,193 @@ def countAggs(playerdict, numType1, numType2):
     roundAgg['Type1PlayingB2'] = divide(numType1PlayingB2, numType1)
     roundAgg['Type2PlayingB1'] = divide(numType2PlayingB1, numType2)
     roundAgg['Type2PlayingB2'] = divide(numType2PlayingB2, numType2)
-    roundAgg['PropPlayingA1'] = (roundAgg['Type1PlayingA1']*PROPTYPE1)+(roundAgg['Type2PlayingA1']*PROPTYPE2)
-    roundAgg['PropPlayingA2'] = (roundAgg['Type1PlayingA2']*PROPTYPE1)+(roundAgg['Type2PlayingA2']*PROPTYPE2)
-    roundAgg['PropPlayingB1'] = (roundAgg['Type1PlayingB1']*PROPTYPE1)+(roundAgg['Type2PlayingB1']*PROPTYPE2)
-    roundAgg['PropPlayingB2'] = (roundAgg['Type1PlayingB2']*PROPTYPE1)+(roundAgg['Type2PlayingB2']*PROPTYPE2)
-    roundAgg['ProbType1GivenA1'] = divide((PROPTYPE1*roundAgg['Type1PlayingA1']), (PROPTYPE1*roundAgg['Type1PlayingA1'])+(PROPTYPE2*roundAgg['Type2PlayingA1']))
-    roundAgg['ProbType2GivenA1'] = divide((PROPTYPE2*roundAgg['Type2PlayingA1']), (PROPTYPE1*roundAgg['Type1PlayingA1'])+(PROPTYPE2*roundAgg['Type2PlayingA1']))
-    roundAgg['ProbType1GivenA2'] = divide((PROPTYPE1*roundAgg['Type1PlayingA2']), (PROPTYPE1*roundAgg['Type1PlayingA2'])+(PROPTYPE2*roundAgg['Type2PlayingA2']))
-    roundAgg['ProbType2GivenA2'] = divide((PROPTYPE2*roundAgg['Type2PlayingA2']), (PROPTYPE1*roundAgg['Type1PlayingA2'])+(PROPTYPE2*roundAgg['Type2PlayingA2']))
-    
-def main():
+    mixedAggs(roundAgg)
+
+def mixedAggs(roundAgg):
     """
-    Main function
+    Computes the aggregate variables of the whole population from those of each type and stores them in roundAgg.
+    
+    Argument(s): 
+        roundAgg -- dict, aggregate variables, with the TypeXPlayingYZ values of the current round.
+        
+    Return(s): 
+        none.
     """
-    for w in range(1, MAXWEIGHT+1):
+    
+    ## Proportions of each type playing A1, A2, B1 and B2, indexed by [playertype-1]
+    typePlaying = np.array([[roundAgg['Type1PlayingA1'], roundAgg['Type1PlayingA2'], 
+                             roundAgg['Type1PlayingB1'], roundAgg['Type1PlayingB2']], 
+                            [roundAgg['Type2PlayingA1'], roundAgg['Type2PlayingA2'], 
+                             roundAgg['Type2PlayingB1'], roundAgg['Type2PlayingB2']]])
+    
+    ## Proportion of all players who are of each type and play each action. Summed over the types this is 
+    ## PROPTYPES @ typePlaying, the proportion of all players playing each action. 
+    weighted = PROPTYPES[:, None]*typePlaying
+    propPlaying = weighted[0]+weighted[1]
+    
+    ## Bayes' rule, the probability of each type given the action, 0 if no one plays the action
+    probTypeGiven = np.divide(weighted, propPlaying, out=np.zeros_like(weighted), where=(propPlaying != 0))
+    
+    (roundAgg['PropPlayingA1'], roundAgg['PropPlayingA2'], 
+     roundAgg['PropPlayingB1'], roundAgg['PropPlayingB2']) = propPlaying.tolist()
+    roundAgg['ProbType1GivenA1'], roundAgg['ProbType1GivenA2'] = probTypeGiven[0, :2].tolist()
+    roundAgg['ProbType2GivenA1'], roundAgg['ProbType2GivenA2'] = probTypeGiven[1, :2].tolist()
+    
+def runSimulation(w, u, seed):
+    """
+    Plays one game for a weight and initial PropPlayingA1.
+    
+    Argument(s): 
+        w -- integer, multiplies Game B payoffs.
+        u -- integer, multiple of 0.05 giving the initial proportion of players with Game A action A1.
+        seed -- SeedSequence, seeds the random number generators of this game.
         
-        weight = w ## Multiplies the Game B payoffs
+    Return(s): 
+        results -- structured array, of RESULTS_DTYPE with the aggregate variables of the initial population 
+                   and of every round.
+    """
+    
+    ## Seeds the game's random number generator, so games running in parallel stay independent
+    rng = np.random.default_rng(seed) ## Random number generator for the population and for play
+    
+    weight = w ## Multiplies the Game B payoffs
+    
+    A1 = (u*0.05) ## Proportion of all players with initial Game A action A1
+    
+    ## Initialize variables
+    Type1PlayingA1 = A1
+    Type1PlayingA2 = 1 - Type1PlayingA1
+    Type2PlayingA1 = A1
+    Type2PlayingA2 = 1 - Type2PlayingA1
+    Type1PlayingB1 = 0.5
+    Type1PlayingB2 = 1 - Type1PlayingB1
+    Type2PlayingB1 = 0.5
+    Type2PlayingB2 = 1 - Type2PlayingB1
+    
+    ## Initializes aggregate variables for round      
+    roundAgg={'Type1PlayingA1': Type1PlayingA1, 'Type1PlayingA2': Type1PlayingA2, 'Type2PlayingA1': Type2PlayingA1,
+              'Type2PlayingA2': Type2PlayingA2, 'Type1PlayingB1': Type1PlayingB1, 'Type1PlayingB2': Type1PlayingB2,
+              'Type2PlayingB1': Type2PlayingB1, 'Type2PlayingB2': Type2PlayingB2, **INITIAL_OTHER_AGGS}
+    mixedAggs(roundAgg)
+    
+    ## Allocates the aggregate variables of every round at once, starting with the initial population
+    results = np.empty(NUMROUNDS+1, dtype=RESULTS_DTYPE)
+    results[0] = tuple(roundAgg[name] for name in AGGVARS)
+            
+    GameB_PAY = weight*GAMEB_PAY ## Game B payoff matrices of this game
+    
+    ## Creates a population of players and the array of their indices by type
+    players, playerlists = GeneratePlayers(weight, roundAgg, rng)
+    
+    ## Counts the Type 1 and Type 2 players
+    numType1 = int(np.count_nonzero(players.playertype == 1))
+    numType2 = POPSIZE - numType1
+    
+    ## Counts the players in each state, kept up to date as they play
+    counts = stateCounts(players.playertype, players.lastActionA, players.lastActionB, players.lastOppGameBLastActionA)
+    
+    typeRows = np.arange(2) ## Rows of playerlists, Type 1 and Type 2
+    
+    ## Play game
+    for x in range(1,NUMROUNDS+1):
+        
+        ## Expected payoffs only depend on the aggregate variables, so compute them once per round
+        EVA, EVB = expectedPayoffs(GAMEA_PAY, GameB_PAY, roundAgg)
+        
+        ## Randomly selects the players and game of each interaction this round, for a subset of the population
+        pairs = rng.integers(0, POPSIZE, (INTERACTIONS_PER_ROUND, 2)) ## Player 1 and player 2 indices
+        games = rng.integers(0, 2, INTERACTIONS_PER_ROUND) ## 0 for Game A or 1 for Game B
+        
+        ## Draws the observed players and revision draws of every move this round at once, 
+        ## indexed by [game, player 1 or 2] (and [Type 1 or Type 2] for the observed players).
+        ## An empty list is never observed from, its draws only need to be valid.
+        observedDraws = np.stack((rng.integers(0, max(numType1, 1), (INTERACTIONS_PER_ROUND, 2)), 
+                                  rng.integers(0, max(numType2, 1), (INTERACTIONS_PER_ROUND, 2))), axis=-1)
+        observedPlayers = playerlists[typeRows, observedDraws] ## Player indices of the draws
+        revisionDraws = rng.random((INTERACTIONS_PER_ROUND, 2))
         
-        for u in range(1, MAXMULT+1):
+        ## Plays the round's interactions
+        playRound(pairs, games, EVA, EVB, observedPlayers, revisionDraws, counts, *players)
+       
+        ## Compute aggregate variables for round
+        countAggs(counts, numType1, numType2, roundAgg)
+        
+        ## Store aggregate variables
+        results[x] = tuple(roundAgg[name] for name in AGGVARS)
+        
+    print('Game complete. Weight=%d PropPlayingA1=%f' % (w, A1))
+    
+    return results
 
-            A1 = (u*0.05) ## Proportion of all players with initial Game A action A1
-            
-            ## Initialize variables
-            Type1PlayingA1 = A1
-            Type1PlayingA2 = 1 - Type1PlayingA1
-            Type2PlayingA1 = A1
-            Type2PlayingA2 = 1 - Type2PlayingA1
-            Type1PlayingB1 = 0.5
-            Type1PlayingB2 = 1 - Type1PlayingB1
-            Type2PlayingB1 = 0.5
-            Type2PlayingB2 = 1 - Type2PlayingB1
-            
-            # Initialize Type1 and Type2 counters
-            numType1 = 0
-            numType2 = 0   
-            
-            ## Create dictionaries and lists
-            playerdict = {} ## Players
-            aggVarsDict = {} # Aggregate variables
-            playerlistType1 = list() ## List of players Type 1
-            playerlistType2 = list() ## List of players Type 2
-            
-            ## Initializes aggregate variables for round      
-            roundAgg={'PropPlayingA1': (Type1PlayingA1*PROPTYPE1)+(Type2PlayingA1*PROPTYPE2),
-                      'PropPlayingA2': (Type1PlayingA2*PROPTYPE1)+(Type2PlayingA2*PROPTYPE2), 
-                      'PropPlayingB1': (Type1PlayingB1*PROPTYPE1)+(Type2PlayingB1*PROPTYPE2), 
-                      'PropPlayingB2': (Type1PlayingB2*PROPTYPE1)+(Type2PlayingB2*PROPTYPE2), 
-                      'ProbType1GivenA1': (PROPTYPE1*Type1PlayingA1)/((PROPTYPE1*Type1PlayingA1)+(PROPTYPE2*Type2PlayingA1)), 
-                      'ProbType2GivenA1': (PROPTYPE2*Type2PlayingA1)/((PROPTYPE1*Type1PlayingA1)+(PROPTYPE2*Type2PlayingA1)), 
-                      'ProbType1GivenA2': (PROPTYPE1*Type1PlayingA2)/((PROPTYPE1*Type1PlayingA2)+(PROPTYPE2*Type2PlayingA2)), 
-                      'ProbType2GivenA2': (PROPTYPE2*Type2PlayingA2)/((PROPTYPE1*Type1PlayingA2)+(PROPTYPE2*Type2PlayingA2)),
-                      'Type1PlayingA1': Type1PlayingA1, 'Type1PlayingA2': Type1PlayingA2, 'Type2PlayingA1': Type2PlayingA1,
-                      'Type2PlayingA2': Type2PlayingA2, 'Type1PlayingB1': Type1PlayingB1, 'Type1PlayingB2': Type1PlayingB2,
-                      'Type2PlayingB1': Type2PlayingB1, 'Type2PlayingB2': Type2PlayingB2, 'proptype1otherA1playB1': 0.5, 
-                      'proptype1otherA1playB2': 0.5, 'proptype1otherA2playB1': 0.5, 'proptype1otherA2playB2': 0.5, 
-                      'proptype2otherA1playB1': 0.5, 'proptype2otherA1playB2': 0.5, 'proptype2otherA2playB1': 0.5, 
-                      'proptype2otherA2playB2': 0.5}
-            
-            ## Initializes aggVarsDict as a dictionary of lists that will track aggregate variables for through the game
-            for key in roundAgg:
-                aggVarsDict['%s' % key]=[roundAgg['%s' % key]]
-                    
-            ## Defines Game A and B payoff matrices (B1 for Game B for a type 1 player, B2 is Game B for a type 2 player)
-            GameA_PAYOFFMAT = {'A1A1': 3, 'A1A2': 0, 'A2A1': 0, 'A2A2' : 3} ## Creates Game A payoff matrix as a dictionary
-            GameB1_PAYOFFMAT = {'B1B1': weight*3, 'B1B2': 0, 'B2B1': 0, 'B2B2' : weight*3} ## defines payoff matrix Game B for type 1 player, as a dictionary
-            GameB2_PAYOFFMAT = {'B1B1': 0, 'B1B2': weight*3, 'B2B1': weight*3, 'B2B2' : 0} ## defines payoff matrix Game B for type 2 player, as a dictionary
-            
-            ## Creates a population of players
-            GeneratePlayers(playerdict, playerlistType1, playerlistType2, weight, roundAgg)
-            
-            for v in range (1, POPSIZE+1):
-                if playerdict[v].playertype == 1:
-                        numType1 = numType1 + 1
-                elif playerdict[v].playertype == 2:
-                        numType2 = numType2 + 1  
-              
-            gamenames = ('A','B') ## Creates list of game names A and B
-            
-            ## Play game
-            for x in range(1,NUMROUNDS+1):
-            
-                ## Randomly select players and games for a subset of the population
-                for y in range(1, int(POPSIZE/20)):
-                    p1index = random.randint(1,POPSIZE)
-                    p2index = random.randint(1,POPSIZE)
-                    Game = random.choice(gamenames) ## Randomly chooses from list "gamenames" and assigns to Game
-                    
-                    if Game == 'A':
-                        playGameA(p1index, p2index, GameA_PAYOFFMAT, GameB1_PAYOFFMAT, GameB2_PAYOFFMAT, 
-                                  playerlistType1, playerlistType2, playerdict, roundAgg)
-                    elif Game == 'B':
-                        playGameB(p1index, p2index, GameA_PAYOFFMAT, GameB1_PAYOFFMAT, GameB2_PAYOFFMAT, 
-                                  playerlistType1, playerlistType2, playerdict, roundAgg)
-               
-                ## Compute aggregate variables for round
-                countAggs(playerdict, numType1, numType2)
-                
-                ## Store aggregate variables
-                for k in aggVarsDict:
-                    aggVarsDict[k].append(roundAgg[k])
-                
-            print('Pickle') 
-            
-            ## Save aggregate variables dictionary to file
-            with open(('weight.%d PropPlayingA1.%d' % (w, u)), 'wb') as handle:
-                pickle.dump(aggVarsDict, handle)
-            print('Game complete. Weight=%d PropPlayingA1=%f' % (w, A1))
+def saveResults(games, rep, allResults, h5path=None):
+    """
+    Saves the aggregate variables of each game, to one HDF5 file per replicate or to a pickle file per game.
+    
+    Argument(s): 
+        games -- list, of (weight, PropPlayingA1 multiplier) tuples.
+        rep -- integer, replicate number of the games.
+        allResults -- iterable, of the results of each game in games, as returned by runSimulation.
+        h5path -- string, HDF5 file name to add the games to, with _r{rep} added before its extension, 
+                  or None to pickle them.
+        
+    Return(s): 
+        none.
+    """
+    
+    if h5path is None:
+        for (w, u), results in zip(games, allResults):
+            ## Save aggregate variables to file, as a dictionary of per-round lists
+            with open(('sim_w%d_u%d_r%d.pkl' % (w, u, rep)), 'wb') as handle:
+                pickle.dump({name: results[name].tolist() for name in AGGVARS}, handle, 
+                            protocol=pickle.HIGHEST_PROTOCOL)
+    else:
+        ## Each replicate gets its own file, so replicates run at once (e.g. SLURM array tasks) never
+        ## write to the same file
+        root, ext = os.path.splitext(h5path)
+        with h5py.File('%s_r%d%s' % (root, rep, ext), 'a') as h5f:
+            for (w, u), results in zip(games, allResults):
+                name = 'w%d_u%d_r%d' % (w, u, rep)
+                if name in h5f: ## A rerun replaces the earlier game
+                    del h5f[name]
+                h5f.create_dataset(name, data=results, compression='gzip')
+
+def main(argv=None):
+    """
+    Main function
+    
+    Argument(s): 
+        argv -- list, of command-line arguments, defaults to sys.argv.
+        
+    Return(s): 
+        none.
+    """
+    
+    parser = argparse.ArgumentParser(description='Plays the norm signaling game over a range of weight and '
+                                     'PropPlayingA1 values.')
+    parser.add_argument('--weight-start', type=int, default=1, help='smallest weight (default: 1)')
+    parser.add_argument('--weight-end', type=int, default=MAXWEIGHT, help='largest weight (default: %d)' % MAXWEIGHT)
+    parser.add_argument('--mult-start', type=int, default=1, help='smallest PropPlayingA1 multiplier (default: 1)')
+    parser.add_argument('--mult-end', type=int, default=MAXMULT, 
+                        help='largest PropPlayingA1 multiplier (default: %d)' % MAXMULT)
+    parser.add_argument('--rep', type=int, default=0, help='replicate number, used in file names and seeds (default: 0)')
+    parser.add_argument('--seed', type=int, default=SEED, help='base seed (default: %d)' % SEED)
+    parser.add_argument('--hdf5', metavar='FILE', default=None, 
+                        help='save every game to one HDF5 file per replicate, FILE with _r{rep} added before '
+                        'its extension, instead of a pickle file per game')
+    parser.add_argument('--jobs', type=int, default=None, help='number of games played at once (default: number of CPUs)')
+    args = parser.parse_args(argv)
+    if args.hdf5 is not None and h5py is None:
+        parser.error('--hdf5 needs the h5py package')
+    
+    ## Every (weight, PropPlayingA1) game is independent, so play them in parallel. Each game is seeded from 
+    ## the base seed and its own coordinates, so it gets the same seed however the sweep is split into jobs.
+    games = list(itertools.product(range(args.weight_start, args.weight_end+1), range(args.mult_start, args.mult_end+1)))
+    seeds = [np.random.SeedSequence(args.seed, spawn_key=(w, u, args.rep)) for w, u in games]
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        allResults = pool.map(runSimulation, [w for w, u in games], [u for w, u in games], seeds)
+        saveResults(games, args.rep, allResults, args.hdf5)
     
     print('PROCESS COMPLETE')
 
-main()
+if __name__ == '__main__':
+    main()